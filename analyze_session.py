@@ -1,10 +1,41 @@
 import argparse
+import csv
 import os
 import glob
 
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
+import matplotlib
+
+try:
+    import numba
+
+    NUMBA_AVAILABLE = True
+except ImportError:  # Pi 上没有 numba 时用 NumPy 版本
+    NUMBA_AVAILABLE = False
+
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pacsv
+except ImportError:  # Pi 上没装 pyarrow 时退回 pandas 的 C 解析器
+    pa = None
+    pacsv = None
+
+
+# Timestamp 保持 float64（毫秒精度），其余数值 float32 就够，数据量减半
+RADAR_DTYPES = {
+    "Timestamp": "float64",
+    "Breath_Rate_BPM": "float32",
+    "Presence_Distance_m": "float32",
+    "Intra_Presence_Score": "float32",
+    "Inter_Presence_Score": "float32",
+    "Presence_Detected": "boolean",
+    "Quality_Flag": "category",
+}
+BELT_DTYPES = {
+    "Timestamp": "float64",
+    "Belt_Breath_Rate_BPM": "float32",
+}
 
 
 def find_session_files(session_dir):
@@ -33,78 +64,355 @@ def find_session_files(session_dir):
     return radar_csv, belt_csv, human_enter
 
 
-def load_radar(radar_csv, presence_dist_range=(0.4, 0.7)):
-    """读取 radar csv，并提取几个关键时间点"""
-    df = pd.read_csv(radar_csv)
+def read_csv_typed(path, dtype):
+    """按 dtype 解析 csv：优先用 pyarrow.csv，没装 pyarrow 就用 pandas C 解析器"""
+    if pacsv is None:
+        return pd.read_csv(path, dtype=dtype, engine="c", na_values=[""])
 
-    # 转数值
-    df["Breath_Rate_BPM"] = pd.to_numeric(df["Breath_Rate_BPM"], errors="coerce")
-    df["Timestamp"] = pd.to_numeric(df["Timestamp"], errors="coerce")
+    arrow_types = {
+        "float64": pa.float64(),
+        "float32": pa.float32(),
+        "boolean": pa.bool_(),
+        "category": pa.dictionary(pa.int32(), pa.string()),
+    }
+    convert_options = pacsv.ConvertOptions(
+        column_types={name: arrow_types[t] for name, t in dtype.items()}
+    )
+    # logger 被 kill 时最后一行可能只写了一半：跳过列数不对的行，而不是整个文件报错
+    parse_options = pacsv.ParseOptions(invalid_row_handler=lambda row: "skip")
+    table = pacsv.read_csv(
+        path, parse_options=parse_options, convert_options=convert_options
+    )
+    # bool 列转成可空的 "boolean"，和 pandas 路径保持一致
+    return table.to_pandas(types_mapper={pa.bool_(): pd.BooleanDtype()}.get)
 
-    # presence 距离
-    if "Presence_Distance_m" in df.columns:
-        df["Presence_Distance_m"] = pd.to_numeric(
-            df["Presence_Distance_m"], errors="coerce"
-        )
 
-    # 第一次 presence (in range)
-    t_presence = None
+def read_csv_cached(path, dtype, use_cache=True):
+    """
+    read_csv_typed + 放在 csv 旁边的 parquet 缓存，
+    缓存文件名带 csv 的 mtime+size，csv 变了就自动失效。
+    """
+    if not use_cache or pa is None:
+        return read_csv_typed(path, dtype)
+
+    st = os.stat(path)
+    sidecar = f"{path}.{st.st_mtime}_{st.st_size}.parquet"
+    if os.path.exists(sidecar):
+        try:
+            return pd.read_parquet(sidecar, engine="pyarrow")
+        except (OSError, pa.ArrowException) as e:
+            # 缓存损坏（比如上次写到一半被中断）：删掉，重新解析 csv
+            print(f"  Parquet cache unreadable, re-parsing {path}: {e}")
+
+    # 删掉旧签名（或损坏）的缓存
+    for stale in glob.glob(f"{glob.escape(path)}.*.parquet"):
+        try:
+            os.remove(stale)
+        except OSError as e:
+            print(f"  Stale Parquet cache not removed: {e}")
+
+    df = read_csv_typed(path, dtype)
+    # 先写临时文件再 os.replace，中断时不会留下签名有效但内容不全的缓存
+    tmp = f"{sidecar}.{os.getpid()}.tmp"
+    try:
+        df.to_parquet(tmp, engine="pyarrow", compression="zstd")
+        os.replace(tmp, sidecar)
+    except (OSError, pa.ArrowException) as e:
+        print(f"  Parquet cache not written for {path}: {e}")
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return df
+
+
+def iter_csv_typed(path, dtype, chunksize, usecols):
+    """
+    分块读取 csv（每块 chunksize 行），只保留 usecols 里实际存在的列，
+    长 session 时内存只和 chunksize 有关。
+    """
+    with open(path, newline="") as f:
+        header = next(csv.reader(f))
+    cols = [c for c in usecols if c in header]
+    yield from pd.read_csv(
+        path,
+        usecols=cols,
+        dtype={c: t for c, t in dtype.items() if c in cols},
+        engine="c",
+        na_values=[""],
+        chunksize=chunksize,
+    )
+
+
+def min_or_none(a, b):
+    """两个可能为 None 的时间取较小值（跨 chunk 维护 running min 用）"""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return min(a, b)
+
+
+def radar_arrays(df):
+    """
+    把 radar DataFrame 拆成后面单遍扫描要用的 ndarray：
+    (ts, det, pres_dist, qf_is_breath, br_bpm)。没有 presence 列时 det 全为 False。
+    """
+    ts = df["Timestamp"].to_numpy()
     if "Presence_Detected" in df.columns and "Presence_Distance_m" in df.columns:
-        mask_pres = (
-            (df["Presence_Detected"] == True)
-            & (df["Presence_Distance_m"] >= presence_dist_range[0])
-            & (df["Presence_Distance_m"] <= presence_dist_range[1])
-        )
-        if mask_pres.any():
-            t_presence = df.loc[mask_pres, "Timestamp"].min()
+        det = df["Presence_Detected"].to_numpy(dtype=bool, na_value=False)
+        pres_dist = df["Presence_Distance_m"].to_numpy()
+    else:
+        det = np.zeros(len(df), dtype=bool)
+        pres_dist = np.full(len(df), np.nan, dtype=np.float32)
+    # Quality_Flag 按 category 读进来，比较整数 codes，不逐个比字符串
+    qf = df["Quality_Flag"].astype("category")
+    if "breathing" in qf.cat.categories:
+        qf_is_breath = qf.cat.codes.to_numpy() == qf.cat.categories.get_loc("breathing")
+    else:
+        qf_is_breath = np.zeros(len(df), dtype=bool)
+    br_bpm = df["Breath_Rate_BPM"].to_numpy()
+    return ts, det, pres_dist, qf_is_breath, br_bpm
 
-    # 第一次有有效呼吸率
-    mask_breath = (df["Quality_Flag"] == "breathing") & df["Breath_Rate_BPM"].notna()
-    t_first_breath = df.loc[mask_breath, "Timestamp"].min() if mask_breath.any() else None
 
-    return df, t_presence, t_first_breath
+def first_event_times(ts, det, pres_dist, qf_is_breath, br_bpm, lo, hi):
+    """
+    返回 (第一次 in-range presence 的时间, 第一次有有效呼吸率的时间)。
+    csv 按时间顺序追加写，所以“第一次”就是 mask 里第一个 True（argmax），
+    不用再切一份数组去求 min。
+    """
+    mask_pres = np.logical_and.reduce((det, pres_dist >= lo, pres_dist <= hi))
+    t_presence = float(ts[mask_pres.argmax()]) if mask_pres.any() else None
 
+    mask_breath = np.logical_and.reduce((qf_is_breath, ~np.isnan(br_bpm)))
+    t_first_breath = float(ts[mask_breath.argmax()]) if mask_breath.any() else None
+
+    return t_presence, t_first_breath
 
-def load_belt(belt_csv):
-    """读取 belt csv，并返回 DataFrame + 第一次有有效 BPM 的时间"""
-    df = pd.read_csv(belt_csv)
-    df["Timestamp"] = pd.to_numeric(df["Timestamp"], errors="coerce")
-    df["Belt_Breath_Rate_BPM"] = pd.to_numeric(
-        df["Belt_Breath_Rate_BPM"], errors="coerce"
-    )
 
-    mask_valid = df["Belt_Breath_Rate_BPM"].notna()
-    t_first_belt = df.loc[mask_valid, "Timestamp"].min() if mask_valid.any() else None
+def belt_first_valid_time(df):
+    """belt 第一次有有效 BPM 的时间"""
+    ts = df["Timestamp"].to_numpy()
+    mask_valid = ~np.isnan(df["Belt_Breath_Rate_BPM"].to_numpy())
+    return float(ts[mask_valid.argmax()]) if mask_valid.any() else None
+
+
+def load_belt(belt_csv, use_cache=True):
+    """读取 belt csv，并返回 DataFrame + 第一次有有效 BPM 的时间"""
+    df = read_csv_cached(belt_csv, BELT_DTYPES, use_cache=use_cache)
+    t_first_belt = belt_first_valid_time(df)
 
     return df, t_first_belt
 
 
+def align_belt(r_ts, b_ts, b_bpm, tolerance_s=0.5):
+    """
+    给每个 radar 时间点找最近的 belt 样本（b_ts 必须已排序），
+    返回和 r_ts 对齐的 belt BPM，超出 tolerance_s 的位置为 NaN。
+    """
+    if len(b_ts) == 0:
+        return np.full(len(r_ts), np.nan)
+
+    # 左右两个候选邻居，取更近的那个（距离相同取左边）
+    idx = np.searchsorted(b_ts, r_ts)
+    idx_l = np.clip(idx - 1, 0, len(b_ts) - 1)
+    idx_r = np.clip(idx, 0, len(b_ts) - 1)
+    chosen = np.where(
+        np.abs(b_ts[idx_l] - r_ts) <= np.abs(b_ts[idx_r] - r_ts), idx_l, idx_r
+    )
+
+    # 输出预先填 NaN，只写入 tolerance 以内的位置
+    belt_bpm = np.full(len(r_ts), np.nan)
+    in_tol = np.abs(b_ts[chosen] - r_ts) <= tolerance_s
+    belt_bpm[in_tol] = b_bpm[chosen[in_tol]]
+    return belt_bpm
+
+
 def merge_radar_belt(radar_df, belt_df, belt_shift_s=0.0, tolerance_s=0.5):
     """
-    用 Timestamp 做 asof merge，
+    用 Timestamp 做 nearest 对齐（np.searchsorted，不生成 merged DataFrame），
     belt_shift_s: 如果你觉得 belt 整体晚/早了几秒，可以用这个参数修正。
+
+    返回 (radar_df, radar_bpm, belt_bpm)：后两个是和 radar_df 行对齐的 ndarray，
+    超出 tolerance_s 的位置 belt_bpm 为 NaN。
     """
-    # 调整 belt 时间轴
-    belt_df = belt_df.copy()
-    belt_df["Timestamp_shifted"] = belt_df["Timestamp"] + belt_shift_s
+    r_ts = radar_df["Timestamp"].to_numpy()
+    radar_bpm = radar_df["Breath_Rate_BPM"].to_numpy()
+
+    # 调整 belt 时间轴；belt csv 是按时间追加写的，通常已经有序，只有乱序时才排序
+    b_ts = belt_df["Timestamp"].to_numpy() + belt_shift_s
+    b_bpm = belt_df["Belt_Breath_Rate_BPM"].to_numpy()
+    if not belt_df["Timestamp"].is_monotonic_increasing:
+        order = np.argsort(b_ts, kind="stable")
+        b_ts = b_ts[order]
+        b_bpm = b_bpm[order]
 
-    radar_sorted = radar_df.sort_values("Timestamp")
-    belt_sorted = belt_df.sort_values("Timestamp_shifted")
+    belt_bpm = align_belt(r_ts, b_ts, b_bpm, tolerance_s)
+    return radar_df, radar_bpm, belt_bpm
 
-    merged = pd.merge_asof(
-        radar_sorted,
-        belt_sorted,
-        left_on="Timestamp",
-        right_on="Timestamp_shifted",
-        direction="nearest",
-        tolerance=tolerance_s,
-        suffixes=("_radar", "_belt"),
+
+def overlap_sums(radar_bpm, belt_bpm):
+    """
+    两边都有有效值的样本上的累加量，可以跨 chunk 直接相加：
+    [n, Σr, Σb, Σr², Σb², Σrb, Σ|r-b|, Σ(r-b)]
+    输入可以是 float32，累加一律用 float64。
+    """
+    valid_mask = ~(np.isnan(radar_bpm) | np.isnan(belt_bpm))
+    r = radar_bpm[valid_mask]
+    b = belt_bpm[valid_mask]
+    d = r - b
+    return np.array(
+        [
+            r.size,
+            r.sum(dtype=np.float64),
+            b.sum(dtype=np.float64),
+            np.einsum("i,i->", r, r, dtype=np.float64),
+            np.einsum("i,i->", b, b, dtype=np.float64),
+            np.einsum("i,i->", r, b, dtype=np.float64),
+            np.abs(d).sum(dtype=np.float64),
+            d.sum(dtype=np.float64),
+        ]
     )
-    return merged
+
+
+if NUMBA_AVAILABLE:
+
+    @numba.njit(cache=True)
+    def compute_all_metrics_nb(
+        ts, det, pres_dist, qf_is_breath, br_bpm, belt_bpm, lo, hi
+    ):
+        """compute_all_metrics 的 jit 版：一遍循环同时算首次时间和 overlap 累加量"""
+        t_presence = np.nan
+        t_first_breath = np.nan
+        sums = np.zeros(8)
+        for i in range(ts.size):
+            r = np.float64(br_bpm[i])
+            if np.isnan(t_presence) and det[i] and lo <= pres_dist[i] <= hi:
+                t_presence = ts[i]
+            if np.isnan(t_first_breath) and qf_is_breath[i] and not np.isnan(r):
+                t_first_breath = ts[i]
+
+            b = np.float64(belt_bpm[i])
+            if np.isnan(r) or np.isnan(b):
+                continue
+            d = r - b
+            sums[0] += 1.0
+            sums[1] += r
+            sums[2] += b
+            sums[3] += r * r
+            sums[4] += b * b
+            sums[5] += r * b
+            sums[6] += abs(d)
+            sums[7] += d
+        return t_presence, t_first_breath, sums
+
+
+def compute_all_metrics(ts, det, pres_dist, qf_is_breath, br_bpm, belt_bpm, lo, hi):
+    """
+    对齐好的数组上一次算出 (t_presence, t_first_breath, sums)，sums 同 overlap_sums。
+    有 numba 时走单遍的 compute_all_metrics_nb，否则用 NumPy 版本。
+    """
+    if not NUMBA_AVAILABLE:
+        t_presence, t_first_breath = first_event_times(
+            ts, det, pres_dist, qf_is_breath, br_bpm, lo, hi
+        )
+        return t_presence, t_first_breath, overlap_sums(br_bpm, belt_bpm)
+
+    t_presence, t_first_breath, sums = compute_all_metrics_nb(
+        ts, det, pres_dist, qf_is_breath, br_bpm, belt_bpm, lo, hi
+    )
+    return (
+        None if np.isnan(t_presence) else float(t_presence),
+        None if np.isnan(t_first_breath) else float(t_first_breath),
+        sums,
+    )
+
+
+def analyze_chunked(
+    radar_csv,
+    belt_csv,
+    presence_dist_range=(0.4, 0.7),
+    belt_shift_s=0.0,
+    tolerance_s=0.5,
+    chunksize=100_000,
+):
+    """
+    分块流式版本的 radar/belt 读取 + merge_radar_belt（适合通宵长 session）。
+    两个 csv 都是按时间顺序追加写的，所以 belt 只需要保留一个滑动窗口：
+    每个 radar chunk 用 np.searchsorted 对齐，之后丢掉早于
+    max(radar ts) - tolerance_s 的 belt 行。
+
+    返回 (t_presence, t_first_radar, t_first_belt, sums, trace)，
+    sums 同 overlap_sums，trace 是每块抽稀后的 (ts, radar_bpm, belt_bpm) 用来画图。
+    """
+    t_presence = t_first_radar = t_first_belt = None
+    sums = np.zeros(8)
+    trace = ([], [], [])
+
+    belt_chunks = iter_csv_typed(
+        belt_csv, BELT_DTYPES, chunksize, ["Timestamp", "Belt_Breath_Rate_BPM"]
+    )
+    win_ts = np.empty(0)
+    win_bpm = np.empty(0, dtype=np.float32)
+    belt_done = False
+
+    radar_chunks = iter_csv_typed(
+        radar_csv,
+        RADAR_DTYPES,
+        chunksize,
+        [
+            "Timestamp",
+            "Quality_Flag",
+            "Breath_Rate_BPM",
+            "Presence_Detected",
+            "Presence_Distance_m",
+        ],
+    )
+    for chunk in radar_chunks:
+        r_ts, det, pres_dist, qf_is_breath, radar_bpm = radar_arrays(chunk)
+        if np.isnan(r_ts).all():
+            continue
+        r_max = np.nanmax(r_ts)
+
+        # belt 窗口要覆盖到 r_max + tolerance_s 之后的第一个样本
+        while not belt_done and (len(win_ts) == 0 or win_ts[-1] <= r_max + tolerance_s):
+            try:
+                b = next(belt_chunks)
+            except StopIteration:
+                belt_done = True
+                break
+            t_first_belt = min_or_none(t_first_belt, belt_first_valid_time(b))
+            win_ts = np.concatenate((win_ts, b["Timestamp"].to_numpy() + belt_shift_s))
+            win_bpm = np.concatenate((win_bpm, b["Belt_Breath_Rate_BPM"].to_numpy()))
+
+        belt_bpm = align_belt(r_ts, win_ts, win_bpm, tolerance_s)
+        tp, tr, chunk_sums = compute_all_metrics(
+            r_ts, det, pres_dist, qf_is_breath, radar_bpm, belt_bpm,
+            *presence_dist_range,
+        )
+        t_presence = min_or_none(t_presence, tp)
+        t_first_radar = min_or_none(t_first_radar, tr)
+        sums += chunk_sums
+
+        stride = max(1, len(r_ts) // 1000)
+        trace[0].append(r_ts[::stride])
+        trace[1].append(radar_bpm[::stride])
+        trace[2].append(belt_bpm[::stride])
+
+        # 之后的 radar 点都 >= r_max，早于 r_max - tolerance_s 的 belt 行不会再被用到
+        keep = np.searchsorted(win_ts, r_max - tolerance_s)
+        win_ts = win_ts[keep:]
+        win_bpm = win_bpm[keep:]
+
+    # radar 先读完时，剩下的 belt 也要扫一遍才能拿到 t_first_belt
+    for b in belt_chunks:
+        t_first_belt = min_or_none(t_first_belt, belt_first_valid_time(b))
+
+    trace = tuple(np.concatenate(parts) if parts else np.empty(0) for parts in trace)
+    return t_presence, t_first_radar, t_first_belt, sums, trace
 
 
 def compute_feasibility_metrics(
-    t_presence, t_first_radar_breath, t_first_belt_breath, merged
+    t_presence, t_first_radar_breath, t_first_belt_breath, sums
 ):
     metrics = {}
 
@@ -120,22 +428,17 @@ def compute_feasibility_metrics(
         metrics["radar_cold_start_from_presence"] = None
 
     # 计算 radar vs belt 误差（只在两边都有有效值时）
-    valid_mask = (
-        merged["Breath_Rate_BPM"].notna()
-        & merged["Belt_Breath_Rate_BPM"].notna()
-    )
-    valid = merged.loc[valid_mask]
-
-    if not valid.empty:
-        diff = valid["Breath_Rate_BPM"] - valid["Belt_Breath_Rate_BPM"]
-        metrics["mean_abs_error_bpm"] = float(diff.abs().mean())
-        metrics["mean_signed_error_bpm"] = float(diff.mean())
-        metrics["corr_radar_belt"] = float(
-            np.corrcoef(
-                valid["Breath_Rate_BPM"], valid["Belt_Breath_Rate_BPM"]
-            )[0, 1]
+    # 用 overlap_sums 的累加量直接得到 Pearson r，不用 np.corrcoef（会再去均值复制一遍数组）
+    n, sr, sb, srr, sbb, srb, sad, sd = sums
+
+    if n:
+        den = (n * srr - sr * sr) * (n * sbb - sb * sb)
+        metrics["mean_abs_error_bpm"] = float(sad / n)
+        metrics["mean_signed_error_bpm"] = float(sd / n)
+        metrics["corr_radar_belt"] = (
+            float((n * srb - sr * sb) / np.sqrt(den)) if den > 0 else float("nan")
         )
-        metrics["n_overlap_samples"] = int(len(valid))
+        metrics["n_overlap_samples"] = int(n)
     else:
         metrics["mean_abs_error_bpm"] = None
         metrics["mean_signed_error_bpm"] = None
@@ -145,27 +448,35 @@ def compute_feasibility_metrics(
     return metrics
 
 
-def plot_bpm(merged, session_dir, show=True):
-    """画一张简单的雷达 vs belt 呼吸率曲线图"""
+def plot_bpm(ts, radar_bpm, belt_bpm, session_dir, show=False, max_points=10_000):
+    """
+    画一张简单的雷达 vs belt 呼吸率曲线图，保存成 session_dir/bpm.png；
+    show=True 时再弹窗显示。点数超过 max_points 时先抽稀。
+    """
+    # 在 main 决定 backend（默认 Agg）之后才 import pyplot
+    import matplotlib.pyplot as plt
+
+    if len(ts) > max_points:
+        stride = len(ts) // max_points
+        ts = ts[::stride]
+        radar_bpm = radar_bpm[::stride]
+        belt_bpm = belt_bpm[::stride]
+
     plt.figure(figsize=(10, 5))
-    plt.plot(
-        merged["Timestamp"],
-        merged["Breath_Rate_BPM"],
-        label="Radar BPM",
-    )
-    plt.plot(
-        merged["Timestamp"],
-        merged["Belt_Breath_Rate_BPM"],
-        label="Belt BPM",
-    )
+    plt.plot(ts, radar_bpm, label="Radar BPM")
+    plt.plot(ts, belt_bpm, label="Belt BPM")
     plt.xlabel("Time (s)")
     plt.ylabel("Breathing rate (BPM)")
     plt.title(f"Radar vs Belt BPM - {os.path.basename(session_dir)}")
     plt.legend()
     plt.grid(True)
     plt.tight_layout()
+    png_path = os.path.join(session_dir, "bpm.png")
+    plt.savefig(png_path, dpi=120)
+    print(f"Plot saved to {png_path}")
     if show:
         plt.show()
+    plt.close()
 
 
 def main():
@@ -194,7 +505,32 @@ def main():
         default=0.7,
         help="Max presence distance (m) for 'enter' detection.",
     )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=None,
+        help="Stream the CSVs in chunks of this many rows to bound memory on "
+        "long sessions (100000 is a good starting point).",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always re-parse the CSVs instead of using the cached .parquet "
+        "files stored next to them.",
+    )
+    parser.add_argument(
+        "--show",
+        action="store_true",
+        help="Also open the BPM plot in an interactive window "
+        "(default: only save bpm.png, works on a headless Pi).",
+    )
     args = parser.parse_args()
+    if args.chunksize is not None and args.chunksize <= 0:
+        parser.error("--chunksize must be a positive number of rows")
+
+    # 无显示器的 Pi 上默认用 Agg，避免初始化 Tk/Qt
+    if not args.show:
+        matplotlib.use("Agg")
 
     session_dir = args.session_dir
 
@@ -207,18 +543,35 @@ def main():
     else:
         print(f"  Human enter time file not found or invalid.")
 
-    radar_df, t_presence, t_first_radar = load_radar(
-        radar_csv,
-        presence_dist_range=(args.presence_min, args.presence_max),
-    )
-    belt_df, t_first_belt = load_belt(belt_csv)
+    presence_dist_range = (args.presence_min, args.presence_max)
+    if args.chunksize is not None:
+        t_presence, t_first_radar, t_first_belt, sums, trace = analyze_chunked(
+            radar_csv,
+            belt_csv,
+            presence_dist_range=presence_dist_range,
+            belt_shift_s=args.belt_shift_s,
+            tolerance_s=0.5,
+            chunksize=args.chunksize,
+        )
+    else:
+        # radar 只做解析；首次时间和误差累加量放到对齐之后一遍算完
+        radar_df = read_csv_cached(
+            radar_csv, RADAR_DTYPES, use_cache=not args.no_cache
+        )
+        belt_df, t_first_belt = load_belt(belt_csv, use_cache=not args.no_cache)
 
-    merged = merge_radar_belt(
-        radar_df, belt_df, belt_shift_s=args.belt_shift_s, tolerance_s=0.5
-    )
+        radar_df, radar_bpm, belt_bpm = merge_radar_belt(
+            radar_df, belt_df, belt_shift_s=args.belt_shift_s, tolerance_s=0.5
+        )
+        ts, det, pres_dist, qf_is_breath, radar_bpm = radar_arrays(radar_df)
+        t_presence, t_first_radar, sums = compute_all_metrics(
+            ts, det, pres_dist, qf_is_breath, radar_bpm, belt_bpm,
+            *presence_dist_range,
+        )
+        trace = (ts, radar_bpm, belt_bpm)
 
     metrics = compute_feasibility_metrics(
-        t_presence, t_first_radar, t_first_belt, merged
+        t_presence, t_first_radar, t_first_belt, sums
     )
 
     print("\n===== FEASIBILITY SUMMARY =====")
@@ -235,7 +588,7 @@ def main():
 
     # 画图
     try:
-        plot_bpm(merged, session_dir, show=True)
+        plot_bpm(*trace, session_dir, show=args.show)
     except Exception as e:
         print(f"Plotting failed: {e}")
 
@@ -1,4 +1,7 @@
+import os
 import time
+import logging
+import signal
 import csv
 import argparse
 from datetime import datetime
@@ -7,6 +10,10 @@ import sys          # ⭐ 新增：为了返回退出码给 shell
 
 from gdx import gdx
 
+# 逐行诊断走 logging，默认 WARNING 不输出；--verbose 时降到 DEBUG
+logger = logging.getLogger("belt")
+logger.setLevel(logging.WARNING)
+
 
 def record_belt_breathing_rate(
     csv_filename="belt_breathing_log.csv",
@@ -42,12 +49,15 @@ def record_belt_breathing_rate(
 
     # 用 start_time 控制采集时长 & 采样间隔
     start_time = time.time()
+    # 本地时区相对 UTC 的秒数，循环里用整数运算拼 HH:MM:SS，不再每次 datetime + strftime
+    utc_offset_s = time.localtime(start_time).tm_gmtoff
 
     # ⭐ 新增：用于“没数据就退出”的逻辑
     got_any_data = False                    # 开始到现在有没有拿到过 data
     NO_DATA_TIMEOUT = 8                     # 比如 8 秒一直没有 data 就判失败
+    FLUSH_EVERY = 10                        # 每 10 次采样 flush + fsync 一次，不再逐行 flush
 
-    with open(csv_filename, "w", newline="") as f:
+    with open(csv_filename, "w", newline="", buffering=8192) as f:
         writer = csv.writer(f)
         # ✅ 对齐 radar 风格的列名
         writer.writerow(
@@ -61,17 +71,26 @@ def record_belt_breathing_rate(
         )
 
         last_bpm = None
+        row = [None] * 5                    # 每行复用同一个 list，避免每次新建
         print("Starting data collection...")
 
+        # 上一次格式化过的整秒和 HH:MM:SS，秒数没变就直接复用
+        last_rounded = -1
+        last_hms = ""
+
         k = 0
+        n_written = 0                       # 已写入的行数（k 是循环次数，没数据时也会加）
         try:
-            while time.time() - start_time < duration_s:
-                now_unix = time.time()
+            while True:
+                now_unix = time.time()                       # 每轮只取一次时间
+                if now_unix - start_time >= duration_s:
+                    break
                 elapsed = now_unix - session_start_unix      # ✅ 用 session 起点
-                now_unix_rounded = int(now_unix)
-                human_time = datetime.fromtimestamp(
-                    now_unix_rounded
-                ).strftime("%H:%M:%S")
+                r = int(now_unix) + utc_offset_s
+                if r != last_rounded:
+                    last_hms = f"{(r // 3600) % 24:02d}:{(r // 60) % 60:02d}:{r % 60:02d}"
+                    last_rounded = r
+                human_time = last_hms
 
                 data = g.read()
 
@@ -81,21 +100,22 @@ def record_belt_breathing_rate(
                     is_new = bpm != last_bpm
                     last_bpm = bpm
 
-                    writer.writerow(
-                        [
-                            f"{elapsed:.3f}",       # Timestamp (sec)
-                            now_unix,               # Unix_Time（保留浮点）
-                            human_time,             # Time_HMS
-                            f"{bpm:.2f}",           # Belt_Breath_Rate_BPM
-                            is_new,                 # Is_New_Value
-                        ]
-                    )
-                    f.flush()
+                    row[0] = f"{elapsed:.3f}"       # Timestamp (sec)
+                    row[1] = now_unix               # Unix_Time（保留浮点）
+                    row[2] = human_time             # Time_HMS
+                    row[3] = f"{bpm:.2f}"           # Belt_Breath_Rate_BPM
+                    row[4] = is_new                 # Is_New_Value
+                    writer.writerow(row)
+                    logger.debug("%s: %.2f bpm", human_time, bpm)
+                    n_written += 1
+                    if n_written % FLUSH_EVERY == 0:
+                        f.flush()
+                        os.fsync(f.fileno())
                 else:
-                    print(f"{human_time}: No data returned")
+                    logger.debug("%s: No data returned", human_time)
 
                 # ⭐ 关键：如果从开始到现在都没拿到任何 data，且超过 NO_DATA_TIMEOUT 秒 → 判失败
-                if (not got_any_data) and (time.time() - start_time > NO_DATA_TIMEOUT):
+                if (not got_any_data) and (now_unix - start_time > NO_DATA_TIMEOUT):
                     print(f"❌ No belt data for {NO_DATA_TIMEOUT} seconds after start. Exiting with error.")
                     try:
                         g.stop()
@@ -116,6 +136,7 @@ def record_belt_breathing_rate(
         except KeyboardInterrupt:
             print("Data collection stopped by user.")
         finally:
+            f.flush()
             print("Stopping and closing GDX...")
             try:
                 g.stop()
@@ -131,6 +152,10 @@ def record_belt_breathing_rate(
     return 0
 
 
+def _raise_keyboard_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
 def parse_args():
     parser = argparse.ArgumentParser(
         description="Record GDX-RB breathing rate to CSV"
@@ -142,11 +167,23 @@ def parse_args():
         default=None,
         help="Output CSV filename (e.g., belt_log.csv)",
     )
+    parser.add_argument(
+        "--verbose",
+        "-v",
+        action="store_true",
+        help="Log every sample (and missed reads) to stderr",
+    )
     return parser.parse_args()
 
 
 if __name__ == "__main__":
     args = parse_args()
+    # run_session.sh 用 kill（SIGTERM）停 belt：当成 Ctrl-C 处理，
+    # 这样 finally 里的 flush 一定会跑，缓冲里的行不会丢
+    signal.signal(signal.SIGTERM, _raise_keyboard_interrupt)
+    logging.basicConfig()
+    if args.verbose:
+        logger.setLevel(logging.DEBUG)
     # automatic naming
     if args.csv_filename is None:
         ts = datetime.now().strftime("%Y%m%d_%H%M%S")
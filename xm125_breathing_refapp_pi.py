@@ -2,9 +2,13 @@
 # XM125 breathing RefApp test on Raspberry Pi -- feasibility CSV version
 from __future__ import annotations
 import time
+import logging
+import operator
 from pathlib import Path
 import datetime
 import csv
+from queue import Empty, Full, Queue
+from threading import Thread
 
 import numpy as np
 import acconeer.exptool as et
@@ -23,6 +27,49 @@ from acconeer.exptool.a121.algo.presence import ProcessorConfig as PresenceProce
 ENTER_DISTANCE_MIN = 0.4
 ENTER_DISTANCE_MAX = 0.7
 
+# 一次 C 层调用取出 presence 结果的 4 个字段
+_presence_get = operator.attrgetter(
+    "presence_detected",
+    "presence_distance",
+    "intra_presence_score",
+    "inter_presence_score",
+)
+
+# 逐帧输出走 logging（INFO），默认不打印；加 -v / --verbose 才显示
+logger = logging.getLogger("radar")
+
+
+def _drain(q, csv_writer, csvfile, errors, batch_n=64, flush_every_s=2.0):
+    """
+    后台写 CSV 的线程：每次从队列里取最多 batch_n 行一起 writerows，
+    每隔 flush_every_s 秒 flush 一次；取到 None 时写完剩下的行并退出。
+    写失败（SD 卡满 / I/O 错误）时把异常放进 errors 再退出，由主循环处理。
+    """
+    last_flush = time.monotonic()
+    done = False
+    try:
+        while not done:
+            batch = []
+            row = q.get()
+            while row is not None:
+                batch.append(row)
+                if len(batch) >= batch_n:
+                    break
+                try:
+                    row = q.get_nowait()
+                except Empty:
+                    break
+            done = row is None
+
+            if batch:
+                csv_writer.writerows(batch)
+            now = time.monotonic()
+            if done or now - last_flush >= flush_every_s:
+                csvfile.flush()
+                last_flush = now
+    except Exception as e:
+        errors.append(e)
+
 
 def main():
     # 增强版 argument parser：在官方 ExampleArgumentParser 上加一个 prefix
@@ -35,6 +82,12 @@ def main():
     )
     args = parser.parse_args()
     et.utils.config_logging(args)
+    # 只给 "radar" logger 自己挂 handler，不动 root：
+    # config_logging 已经给 acconeer logger 挂了 handler，root 再挂会让 acconeer 的日志打两遍
+    if not logger.handlers:
+        logger.addHandler(logging.StreamHandler())
+    logger.propagate = False
+    logger.setLevel(logging.INFO if (args.verbose or args.debug) else logging.WARNING)
 
     # ---------- 0) 读 session_start_unix ----------
     session_start_path = Path("session_start_unix.txt")
@@ -136,90 +189,136 @@ def main():
                 "Radar_Enter_Time",       # 雷达第一次检测到 presence in range 的时间（秒），未检测则为空
             ])
 
-            while not interrupt_handler.got_signal:
-                processed_data = ref_app.get_next()
-                unix_time = time.time()                        # 绝对时间
-                current_time = unix_time - session_start_unix  # 从 session_start 算起的相对秒
+            # 写 CSV 放到后台线程，SD 卡写慢了也不会拖住下一次 get_next()
+            # 队列有上限：写线程跟不上或卡住时不会无限占内存
+            q = Queue(maxsize=1024)
+            writer_errors = []
+            writer_thread = Thread(
+                target=_drain, args=(q, csv_writer, csvfile, writer_errors), daemon=True
+            )
+            writer_thread.start()
+
+            # App_State / Distances_Being_Analyzed 很少变化，只在变化时转一次字符串，
+            # csv.writer 拿到的就是现成的 str（None 照 csv.writer 的规则写成空）
+            last_app_state = last_distances = object()
+            app_state_str = distances_str = ""
+
+            try:
+                while not interrupt_handler.got_signal:
+                    processed_data = ref_app.get_next()
+                    unix_time = time.time()                        # 绝对时间
+                    current_time = unix_time - session_start_unix  # 从 session_start 算起的相对秒
+
+                    try:
+                        breathing_res = processed_data.breathing_result
+                        presence_res = processed_data.presence_result
+
+                        # 默认值
+                        quality_flag = "none"
+                        breath_rate_bpm = ""
+
+                        presence_detected = ""
+                        presence_distance = ""
+                        intra_presence_score = ""
+                        inter_presence_score = ""
+                        presence_distance_index = ""
+
+                        # ----- 取 presence 相关的 scalar -----
+                        if presence_res is not None:
+                            (
+                                presence_detected,
+                                presence_distance,
+                                intra_presence_score,
+                                inter_presence_score,
+                            ) = _presence_get(presence_res)
+
+                            # extra_result 通常都在，try 比每帧 hasattr 便宜
+                            try:
+                                extra_result = presence_res.extra_result
+                            except AttributeError:
+                                extra_result = None
+                            if extra_result is not None:
+                                presence_distance_index = extra_result.presence_distance_index
+
+                            # ⭐ 如果还没记录过 radar_enter_time，且 presence 距离落在目标范围内，则记录
+                            if (
+                                radar_enter_time is None
+                                and presence_detected
+                                and presence_distance is not None
+                                and ENTER_DISTANCE_MIN <= presence_distance <= ENTER_DISTANCE_MAX
+                            ):
+                                radar_enter_time = current_time
+                                print(f"📌 Radar enter time marked at {radar_enter_time:.2f} s")
+
+                        # ----- 处理 breathing 相关 -----
+                        if breathing_res is not None:
+                            br = breathing_res.breathing_rate
+                            if br:
+                                # case 1: 有 breathing_result 且有 breathing_rate
+                                quality_flag = "breathing"
+                                breath_rate_bpm = br * ratio
+                                logger.info("%.2fs\t%.2f bpm", current_time, breath_rate_bpm)
+                            else:
+                                # case 2: 有 breathing_result 但暂时还没出 rate
+                                quality_flag = "breathing_no_rate"
+                                logger.info("%.2fs\tCalculating respiration rate...", current_time)
+
+                        elif presence_res is not None:
+                            # case 3: 只有 presence 结果
+                            quality_flag = "presence_only"
+                            logger.info("%.2fs\tPresence detected, no breathing yet", current_time)
 
-                try:
-                    breathing_res = processed_data.breathing_result
-                    presence_res = processed_data.presence_result
-
-                    # 默认值
-                    quality_flag = "none"
-                    breath_rate_bpm = ""
-
-                    presence_detected = ""
-                    presence_distance = ""
-                    intra_presence_score = ""
-                    inter_presence_score = ""
-                    presence_distance_index = ""
-
-                    # ----- 取 presence 相关的 scalar -----
-                    if presence_res is not None:
-                        presence_detected = presence_res.presence_detected
-                        presence_distance = presence_res.presence_distance
-                        intra_presence_score = presence_res.intra_presence_score
-                        inter_presence_score = presence_res.inter_presence_score
-
-                        if hasattr(presence_res, "extra_result") and presence_res.extra_result is not None:
-                            presence_distance_index = presence_res.extra_result.presence_distance_index
-
-                        # ⭐ 如果还没记录过 radar_enter_time，且 presence 距离落在目标范围内，则记录
-                        if (
-                            radar_enter_time is None
-                            and presence_detected
-                            and presence_distance is not None
-                            and ENTER_DISTANCE_MIN <= presence_distance <= ENTER_DISTANCE_MAX
-                        ):
-                            radar_enter_time = current_time
-                            print(f"📌 Radar enter time marked at {radar_enter_time:.2f} s")
-
-                    # ----- 处理 breathing 相关 -----
-                    if breathing_res is not None:
-                        br = breathing_res.breathing_rate
-                        if br:
-                            # case 1: 有 breathing_result 且有 breathing_rate
-                            quality_flag = "breathing"
-                            breath_rate_bpm = br * ratio
-                            print(f"{current_time:.2f}s\t{breath_rate_bpm:.2f} bpm")
                         else:
-                            # case 2: 有 breathing_result 但暂时还没出 rate
-                            quality_flag = "breathing_no_rate"
-                            print(f"{current_time:.2f}s\tCalculating respiration rate...")
-
-                    elif presence_res is not None:
-                        # case 3: 只有 presence 结果
-                        quality_flag = "presence_only"
-                        print(f"{current_time:.2f}s\tPresence detected, no breathing yet")
-
-                    else:
-                        # case 4: 连 presence 也没有
-                        quality_flag = "none"
-                        print(f"{current_time:.2f}s\tNo presence")
-
-                    # ----- Radar enter 时间（如果还没发生则为空） -----
-                    radar_enter_time_val = radar_enter_time if radar_enter_time is not None else ""
-
-                    # ----- 写一行简化后的 CSV -----
-                    row = [
-                        current_time,
-                        unix_time,
-                        quality_flag,
-                        breath_rate_bpm,
-                        processed_data.app_state,
-                        processed_data.distances_being_analyzed,
-                        presence_detected,
-                        presence_distance,
-                        intra_presence_score,
-                        inter_presence_score,
-                        presence_distance_index,
-                        radar_enter_time_val,
-                    ]
-                    csv_writer.writerow(row)
-
-                except et.PGProccessDiedException:
-                    break
+                            # case 4: 连 presence 也没有
+                            quality_flag = "none"
+                            logger.info("%.2fs\tNo presence", current_time)
+
+                        # ----- Radar enter 时间（如果还没发生则为空） -----
+                        radar_enter_time_val = radar_enter_time if radar_enter_time is not None else ""
+
+                        app_state = processed_data.app_state
+                        if app_state is not last_app_state:
+                            last_app_state = app_state
+                            app_state_str = "" if app_state is None else str(app_state)
+                        distances = processed_data.distances_being_analyzed
+                        if distances != last_distances:
+                            last_distances = distances
+                            distances_str = "" if distances is None else str(distances)
+
+                        # ----- 写一行简化后的 CSV -----
+                        row = [
+                            current_time,
+                            unix_time,
+                            quality_flag,
+                            breath_rate_bpm,
+                            app_state_str,
+                            distances_str,
+                            presence_detected,
+                            presence_distance,
+                            intra_presence_score,
+                            inter_presence_score,
+                            presence_distance_index,
+                            radar_enter_time_val,
+                        ]
+                        # 写线程挂了就停止采集，和以前同步写时一样直接报错
+                        if writer_errors:
+                            raise RuntimeError("Radar CSV writer failed") from writer_errors[0]
+                        # 队列满 5 s 还放不进去，说明写线程卡住了，抛 queue.Full
+                        q.put(row, timeout=5.0)
+
+                    except et.PGProccessDiedException:
+                        break
+            finally:
+                # Ctrl-C / 异常退出时也让写线程把队列里剩下的行写完
+                try:
+                    q.put(None, timeout=2.0)
+                except Full:
+                    pass
+                writer_thread.join(timeout=2.0)
+                if writer_errors:
+                    print(f"❌ CSV writer failed, later rows were not saved: {writer_errors[0]!r}")
+                elif writer_thread.is_alive():
+                    print("⚠️ CSV writer did not finish within 2 s, some rows may be lost")
 
         ref_app.stop()
         print("Disconnecting...")